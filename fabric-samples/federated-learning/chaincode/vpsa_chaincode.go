@@ -384,6 +384,21 @@ func (c *VPSAContract) GetLocalModelsByRound(ctx contractapi.TransactionContextI
     return models, nil
 }
 
+// GetLocalModelsBatch retrieves several local models in one query, skipping IDs that do not exist
+func (c *VPSAContract) GetLocalModelsBatch(ctx contractapi.TransactionContextInterface,
+    modelIDs []string) ([]*LocalModel, error) {
+
+    var models []*LocalModel
+    for _, modelID := range modelIDs {
+        model, err := c.GetLocalModel(ctx, modelID)
+        if err == nil {
+            models = append(models, model)
+        }
+    }
+
+    return models, nil
+}
+
 // AggregateModels performs federated aggregation
 func (c *VPSAContract) AggregateModels(ctx contractapi.TransactionContextInterface,
     modelIDs []string, aggregatedWeights string, aggregatedPrototypes string,
@@ -1,14 +1,68 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from flask import Flask, request, jsonify, Response
+from flask.json.provider import JSONProvider
 import subprocess
-import json
+import orjson
 import os
 import logging
 from datetime import datetime
+from collections import OrderedDict
+import threading
+import time
+import asyncio
+import concurrent.futures
+import tempfile
+import base64
 import re
+import numpy as np
+
+try:
+    from hfc.fabric import Client as FabricClient
+except ImportError:
+    FabricClient = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+def to_json(obj):
+    """Serialize obj to a JSON string, encoding NumPy arrays natively"""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+def fastjson(obj, status=200):
+    """Build a JSON response with orjson directly, skipping jsonify"""
+    return Response(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY), status=status, mimetype='application/json')
+
+class ORJSONProvider(JSONProvider):
+    """Route Flask's request parsing and jsonify through orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return to_json(obj)
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
-CORS(app)
+app.json = ORJSONProvider(app)
+
+# The dashboard is served from another origin; the route set is small and
+# fixed, so the CORS headers are built once instead of per request
+_CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type'
+}
+
+@app.before_request
+def answer_preflight():
+    """Answer CORS preflights for known routes without dispatching them"""
+    if request.method == 'OPTIONS' and request.url_rule is not None:
+        return Response(status=204, headers={'Access-Control-Max-Age': '86400'})
+
+@app.after_request
+def add_cors_headers(response):
+    response.headers.update(_CORS_HEADERS)
+    return response
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,16 +72,65 @@ logger = logging.getLogger(__name__)
 FABRIC_CONFIG = {
     'channel': 'vpsa-channel',
     'chaincode': 'vpsa',
-    'network_path': '/home/amalendu/college/federatedLearning/fabric-samples/test-network'
+    'network_path': '/home/amalendu/college/federatedLearning/fabric-samples/test-network',
+    # 'sdk' talks gRPC through fabric-sdk-py, 'helper' keeps one peer-helper
+    # process connected to the gateway, 'cli' shells out to the peer binary
+    'gateway': 'sdk',
+    'peer_helper': os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'peer-helper', 'peer-helper')
+}
+
+# Read-only chaincode functions whose results are cached, mapped to how many
+# seconds an entry may be served. Transactions only invalidate the cache of the
+# worker that sent them and models can be resubmitted under the same ID, so
+# every entry has a short TTL to bound how stale any gunicorn worker or other
+# backend can get
+CACHED_QUERIES = {
+    'GetLocalModel': 2.0,
+    'GetClient': 2.0,
+    'GetAggregationConfig': 2.0,
+    'GetAllClients': 2.0,
+    'GetGlobalModel': 2.0,
+    'GetAllTrainingMetrics': 2.0
 }
+# Every gunicorn worker holds its own cache, so bound it by entries and by
+# payload bytes; a payload larger than QUERY_CACHE_MAX_ENTRY_BYTES is not cached
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_BYTES = 64 * 1024 * 1024
+QUERY_CACHE_MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+ANSI_ESCAPE = re.compile(rb'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
 
 class FabricGateway:
     """Interface to interact with Hyperledger Fabric network"""
     
     def __init__(self):
         self.network_path = FABRIC_CONFIG['network_path']
+        self.use_sdk = FABRIC_CONFIG['gateway'] == 'sdk'
+        if self.use_sdk and FabricClient is None:
+            logger.warning("fabric-sdk-py is not installed, falling back to the peer CLI")
+            self.use_sdk = False
+        self.use_helper = FABRIC_CONFIG['gateway'] == 'helper'
+        if self.use_helper and not os.access(FABRIC_CONFIG['peer_helper'], os.X_OK):
+            logger.warning("peer-helper is not built, falling back to the peer CLI")
+            self.use_helper = False
+        self.reset()
         self.setup_environment()
     
+    def reset(self):
+        """Drop connections and cached results, e.g. in a freshly forked worker"""
+        self._query_cache = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_lock = threading.Lock()
+        # The event loop and SDK client are created lazily so nothing is shared
+        # across a fork
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._sdk = None
+        self._sdk_lock = threading.Lock()
+        # A helper inherited across a fork is left to the parent
+        self._helper = None
+        self._helper_lock = threading.Lock()
+    
     def setup_environment(self):
         """Setup environment variables for Fabric CLI"""
         os.environ['CORE_PEER_TLS_ENABLED'] = 'true'
@@ -38,33 +141,282 @@ class FabricGateway:
         os.environ['PATH'] = f"{self.network_path}/../bin:" + os.environ.get('PATH', '')
         os.environ['FABRIC_CFG_PATH'] = f"{self.network_path}/../config/"
     
-    def parse_fabric_output(self, output):
-        """Parse Fabric CLI output to extract actual response"""
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        clean_output = ansi_escape.sub('', output)
+    @staticmethod
+    def _first_file(directory):
+        return os.path.join(directory, sorted(os.listdir(directory))[0])
+    
+    def connection_profile(self):
+        """Build the fabric-sdk-py connection profile for the test network"""
+        orgs_path = f"{self.network_path}/organizations"
+        admin_msp = f"{orgs_path}/peerOrganizations/org1.example.com/users/Admin@org1.example.com/msp"
         
-        lines = clean_output.strip().split('\n')
+        def peer(org, port):
+            return {
+                'url': f'localhost:{port}',
+                'grpcOptions': {'grpc.ssl_target_name_override': f'peer0.{org}'},
+                'tlsCACerts': {'path': f"{orgs_path}/peerOrganizations/{org}/peers/peer0.{org}/tls/ca.crt"}
+            }
         
-        for line in lines:
-            line = line.strip()
-            if line and (line.startswith('{') or line.startswith('[')):
+        return {
+            'name': 'vpsa-network',
+            'version': '1.0',
+            'client': {
+                'organization': 'Org1',
+                'credentialStore': {'path': os.path.join(tempfile.gettempdir(), 'vpsa-hfc-kvs')}
+            },
+            'organizations': {
+                'org1.example.com': {
+                    'mspid': 'Org1MSP',
+                    'peers': ['peer0.org1.example.com'],
+                    'users': {
+                        'Admin': {
+                            'cert': self._first_file(f"{admin_msp}/signcerts"),
+                            'private_key': self._first_file(f"{admin_msp}/keystore")
+                        }
+                    }
+                }
+            },
+            'orderers': {
+                'orderer.example.com': {
+                    'url': 'localhost:7050',
+                    'grpcOptions': {'grpc.ssl_target_name_override': 'orderer.example.com'},
+                    'tlsCACerts': {'path': f"{orgs_path}/ordererOrganizations/example.com/orderers/orderer.example.com/msp/tlscacerts/tlsca.example.com-cert.pem"}
+                }
+            },
+            'peers': {
+                'peer0.org1.example.com': peer('org1.example.com', 7051),
+                'peer0.org2.example.com': peer('org2.example.com', 9051)
+            },
+            'certificateAuthorities': {}
+        }
+    
+    def _event_loop(self):
+        """The event loop running on a background thread that async calls are scheduled on"""
+        # Request handlers must not run their own loop with asyncio.run(): gevent
+        # greenlets share one OS thread, so another request's loop looks running
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='fabric-async', daemon=True).start()
+            return self._loop
+    
+    def _sdk_client(self):
+        """Connect through fabric-sdk-py on first use and keep the gRPC channels open"""
+        with self._sdk_lock:
+            if self._sdk is None:
+                with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as profile:
+                    profile.write(to_json(self.connection_profile()))
+                
+                # aiogrpc channels are bound to the loop they are created on, so
+                # every call is scheduled on the background loop
+                loop = self._event_loop()
+                
+                async def connect():
+                    client = FabricClient(net_profile=profile.name)
+                    client.new_channel(FABRIC_CONFIG['channel'])
+                    # Created on the loop it guards, see _invoke_sdk
+                    return client, asyncio.Lock()
+                
                 try:
-                    return json.loads(line)
-                except json.JSONDecodeError:
-                    continue
+                    client, self._sdk_invoke_lock = asyncio.run_coroutine_threadsafe(connect(), loop).result()
+                finally:
+                    # The profile is read once when the client is created
+                    os.unlink(profile.name)
+                self._sdk = (loop, client, client.get_user('org1.example.com', 'Admin'))
+            return self._sdk
+    
+    def _run_sdk(self, make_request, timeout):
+        loop, client, admin = self._sdk_client()
+        return asyncio.run_coroutine_threadsafe(make_request(client, admin), loop).result(timeout)
+    
+    def _helper_call(self, request_type, function, args):
+        """Write one request line to the peer helper and read its response line"""
+        line = orjson.dumps({"type": request_type, "function": function, "args": args}) + b'\n'
+        with self._helper_lock:
+            # Started on first use and again if it has exited; it exits by
+            # itself once its stdin is closed
+            if self._helper is None or self._helper.poll() is not None:
+                self._helper = subprocess.Popen(
+                    [FABRIC_CONFIG['peer_helper'],
+                     '-channel', FABRIC_CONFIG['channel'],
+                     '-chaincode', FABRIC_CONFIG['chaincode']],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=self.network_path)
+            try:
+                self._helper.stdin.write(line)
+                self._helper.stdin.flush()
+                response = self._helper.stdout.readline()
+            except OSError:
+                response = b''
+            if not response:
+                self._helper.kill()
+                self._helper = None
+                raise RuntimeError("peer-helper exited")
+        return orjson.loads(response)
+    
+    @staticmethod
+    def _payload_response(payload):
+        """Wrap a query payload, keeping JSON as raw bytes"""
+        payload = payload.encode()
+        if payload.lstrip()[:1] in (b'{', b'['):
+            return {"success": True, "raw": payload}
+        try:
+            data = orjson.loads(payload)
+        except ValueError:
+            data = payload.decode()
         
-        for line in reversed(lines):
-            if line.strip():
-                try:
-                    return json.loads(line.strip())
-                except:
-                    return line.strip()
+        return {"success": True, "data": data}
+    
+    def extract_json_payload(self, output):
+        """Return the JSON object or array in Fabric CLI output as bytes, or None"""
+        if isinstance(output, str):
+            output = output.encode()
+        clean_output = ANSI_ESCAPE.sub(b'', output).strip()
+        
+        # The payload is the JSON document spanning the first opening and the
+        # last closing bracket, so slice it out instead of splitting into lines
+        starts = [i for i in (clean_output.find(b'{'), clean_output.find(b'[')) if i != -1]
+        if not starts:
+            return None
+        start = min(starts)
+        end = max(clean_output.rfind(b'}'), clean_output.rfind(b']')) + 1
+        if end <= start:
+            return None
+        return clean_output[start:end]
+    
+    def parse_fabric_output(self, output):
+        """Parse Fabric CLI output to extract actual response"""
+        if isinstance(output, str):
+            output = output.encode()
+        payload = self.extract_json_payload(output)
+        if payload is not None:
+            try:
+                return orjson.loads(payload)
+            except ValueError:
+                pass
+        
+        clean_output = ANSI_ESCAPE.sub(b'', output).strip()
+        last_line = clean_output.rsplit(b'\n', 1)[-1].strip()
+        try:
+            return orjson.loads(last_line)
+        except ValueError:
+            return last_line.decode(errors='replace')
+    
+    def _cache_get(self, key):
+        with self._cache_lock:
+            entry = self._query_cache.get(key)
+            if entry is None:
+                return None
+            expires_at, size, result = entry
+            if expires_at <= time.monotonic():
+                self._cache_drop(key)
+                return None
+            self._query_cache.move_to_end(key)
+            return result
+    
+    def _cache_drop(self, key):
+        """Remove key from the cache; the cache lock must be held"""
+        entry = self._query_cache.pop(key, None)
+        if entry is not None:
+            self._cache_bytes -= entry[1]
+    
+    def _cache_put(self, key, result):
+        size = len(result.get('raw', b''))
+        if size > QUERY_CACHE_MAX_ENTRY_BYTES:
+            return
+        now = time.monotonic()
+        with self._cache_lock:
+            # Drop expired entries now rather than when they are next read,
+            # so dead models do not stay resident
+            for stale in [k for k, entry in self._query_cache.items() if entry[0] <= now]:
+                self._cache_drop(stale)
+            self._cache_drop(key)
+            
+            self._query_cache[key] = (now + CACHED_QUERIES[key[0]], size, result)
+            self._cache_bytes += size
+            while len(self._query_cache) > QUERY_CACHE_SIZE or self._cache_bytes > QUERY_CACHE_BYTES:
+                self._cache_drop(next(iter(self._query_cache)))
+    
+    def _invalidate_cache(self, function, args):
+        """Drop cached query results for the keys a transaction writes"""
+        stale = []
+        if function == 'RegisterClient':
+            stale.append(('GetClient', (args[0],)))
+            stale.append(('GetAllClients', ()))
+        elif function == 'SubmitLocalModel':
+            stale.append(('GetLocalModel', (args[0],)))
+            stale.append(('GetClient', (args[1],)))
+            stale.append(('GetAllClients', ()))
+        elif function == 'AggregateModels':
+            stale.extend(('GetLocalModel', (model_id,)) for model_id in orjson.loads(args[0]))
+            stale.append(('GetAggregationConfig', ()))
+            stale.append(('GetGlobalModel', ()))
+            stale.append(('GetAllTrainingMetrics', ()))
+        elif function == 'UpdateAggregationConfig':
+            stale.append(('GetAggregationConfig', ()))
         
-        return output
+        with self._cache_lock:
+            for key in stale:
+                self._cache_drop(key)
     
     def invoke_chaincode(self, function, args):
         """Invoke chaincode function with endorsements from both orgs"""
-        args_json = json.dumps({"function": function, "Args": args})
+        try:
+            if self.use_helper:
+                return self._invoke_helper(function, args)
+            if self.use_sdk:
+                return self._invoke_sdk(function, args)
+            return self._invoke_cli(function, args)
+        finally:
+            # Even a failed or timed out invoke may have been committed
+            self._invalidate_cache(function, args)
+    
+    def _invoke_sdk(self, function, args):
+        async def invoke(client, admin):
+            # chaincode_invoke keeps the commit event it waits for on the
+            # client itself, so overlapping invokes would clobber each other
+            async with self._sdk_invoke_lock:
+                return await client.chaincode_invoke(
+                    requestor=admin,
+                    channel_name=FABRIC_CONFIG['channel'],
+                    peers=['peer0.org1.example.com', 'peer0.org2.example.com'],
+                    args=args,
+                    cc_name=FABRIC_CONFIG['chaincode'],
+                    fcn=function,
+                    wait_for_event=True
+                )
+        
+        try:
+            response = self._run_sdk(invoke, timeout=30)
+            # chaincode_invoke returns endorsement and ordering failures as a
+            # message instead of raising; VPSA transactions have no payload
+            if response:
+                logger.error(f"Invoke failed: {response}")
+                return {"success": False, "error": response}
+            
+            logger.info(f"Invoke {function} committed")
+            return {"success": True, "output": response}
+        except (TimeoutError, concurrent.futures.TimeoutError):
+            logger.error("Invoke timeout")
+            return {"success": False, "error": "Transaction timeout"}
+        except Exception as e:
+            logger.error(f"Exception during invoke: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def _invoke_helper(self, function, args):
+        try:
+            response = self._helper_call('submit', function, args)
+            if 'error' in response:
+                logger.error(f"Invoke failed: {response['error']}")
+                return {"success": False, "error": response['error']}
+            
+            logger.info(f"Invoke {function} committed")
+            return {"success": True, "output": response['result']}
+        except Exception as e:
+            logger.error(f"Exception during invoke: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def _invoke_cli(self, function, args):
+        args_json = to_json({"function": function, "Args": args})
         
         # Build command with BOTH peer addresses for endorsement
         cmd = [
@@ -100,109 +452,375 @@ class FabricGateway:
             logger.error(f"Exception during invoke: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def query_chaincode(self, function, args):
-        """Query chaincode function"""
-        args_json = json.dumps({"function": function, "Args": args})
+    @staticmethod
+    def _parsed(response):
+        """A query response with the raw payload parsed into data
         
-        cmd = [
+        A new dict is returned, so a cached response keeps only its raw bytes.
+        """
+        if response['success'] and 'data' not in response:
+            try:
+                data = orjson.loads(response['raw'])
+            except ValueError:
+                data = response['raw'].decode(errors='replace')
+            return {"success": True, "data": data}
+        return response
+    
+    def query_chaincode(self, function, args, raw=False):
+        """Query chaincode function
+        
+        With raw=True a JSON payload is returned unparsed under 'raw' so it can be
+        forwarded as is; 'data' is only filled in when the payload is not JSON.
+        """
+        cache_key = (function, tuple(args))
+        response = None
+        if function in CACHED_QUERIES:
+            response = self._cache_get(cache_key)
+        
+        if response is None:
+            if self.use_helper:
+                response = self._query_helper(function, args)
+            elif self.use_sdk:
+                response = self._query_sdk(function, args)
+            else:
+                response = self._query_cli(function, args)
+            
+            if response['success'] and function in CACHED_QUERIES:
+                self._cache_put(cache_key, response)
+        
+        if raw and 'raw' in response:
+            return response
+        return self._parsed(response)
+    
+    def query_chaincode_many(self, function, args_list):
+        """Run independent queries concurrently, returning responses in order"""
+        responses = [None] * len(args_list)
+        pending = []
+        for i, args in enumerate(args_list):
+            if function in CACHED_QUERIES:
+                responses[i] = self._cache_get((function, tuple(args)))
+            if responses[i] is None:
+                pending.append(i)
+        
+        if pending:
+            try:
+                if self.use_helper:
+                    # The helper serves one request at a time, and each is cheap
+                    results = [self._query_helper(function, args_list[i]) for i in pending]
+                else:
+                    if self.use_sdk:
+                        loop, client, admin = self._sdk_client()
+                        coros = [self._query_sdk_async(client, admin, function, args_list[i]) for i in pending]
+                    else:
+                        loop = self._event_loop()
+                        coros = [self._query_cli_async(function, args_list[i]) for i in pending]
+                    
+                    async def gather():
+                        return await asyncio.gather(*coros)
+                    
+                    results = asyncio.run_coroutine_threadsafe(gather(), loop).result()
+            except Exception as e:
+                logger.error(f"Exception during query: {str(e)}")
+                results = [{"success": False, "error": str(e)}] * len(pending)
+            
+            for i, response in zip(pending, results):
+                responses[i] = response
+                if response['success'] and function in CACHED_QUERIES:
+                    self._cache_put((function, tuple(args_list[i])), response)
+        
+        return [self._parsed(response) for response in responses]
+    
+    def _query_sdk(self, function, args):
+        try:
+            loop, client, admin = self._sdk_client()
+            return asyncio.run_coroutine_threadsafe(
+                self._query_sdk_async(client, admin, function, args), loop).result()
+        except Exception as e:
+            logger.error(f"Exception during query: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    async def _query_sdk_async(self, client, admin, function, args):
+        try:
+            payload = await asyncio.wait_for(client.chaincode_query(
+                requestor=admin,
+                channel_name=FABRIC_CONFIG['channel'],
+                peers=['peer0.org1.example.com'],
+                args=args,
+                cc_name=FABRIC_CONFIG['chaincode'],
+                fcn=function
+            ), timeout=15)
+            return self._payload_response(payload)
+        except asyncio.TimeoutError:
+            logger.error("Query timeout")
+            return {"success": False, "error": "Query timeout"}
+        except Exception as e:
+            logger.error(f"Exception during query: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def _query_helper(self, function, args):
+        try:
+            response = self._helper_call('evaluate', function, args)
+            if 'error' in response:
+                logger.error(f"Query failed: {response['error']}")
+                return {"success": False, "error": response['error']}
+            return self._payload_response(response['result'])
+        except Exception as e:
+            logger.error(f"Exception during query: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def _query_command(self, function, args):
+        args_json = to_json({"function": function, "Args": args})
+        
+        return [
             'peer', 'chaincode', 'query',
             '-C', FABRIC_CONFIG['channel'],
             '-n', FABRIC_CONFIG['chaincode'],
             '-c', args_json
         ]
+    
+    def _cli_response(self, stdout):
+        """Wrap peer CLI query output, keeping a JSON payload as raw bytes"""
+        payload = self.extract_json_payload(stdout)
+        if payload is not None:
+            # The bracket slice is only a guess, and raw payloads are forwarded
+            # as application/json, so check it parses; cheap next to the subprocess
+            try:
+                orjson.loads(payload)
+                return {"success": True, "raw": payload}
+            except ValueError:
+                pass
+        return {"success": True, "data": self.parse_fabric_output(stdout)}
+    
+    def _query_cli(self, function, args):
+        cmd = self._query_command(function, args)
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, cwd=self.network_path, timeout=15)
+            result = subprocess.run(cmd, capture_output=True, cwd=self.network_path, timeout=15)
             if result.returncode != 0:
-                logger.error(f"Query failed: {result.stderr}")
-                return {"success": False, "error": result.stderr}
+                error = result.stderr.decode(errors='replace')
+                logger.error(f"Query failed: {error}")
+                return {"success": False, "error": error}
             
             logger.info(f"Query raw output: {repr(result.stdout)}")
-            parsed_output = self.parse_fabric_output(result.stdout)
-            logger.info(f"Query parsed output: {parsed_output}")
-            
-            return {"success": True, "data": parsed_output}
+            return self._cli_response(result.stdout)
         except subprocess.TimeoutExpired:
             logger.error("Query timeout")
             return {"success": False, "error": "Query timeout"}
         except Exception as e:
             logger.error(f"Exception during query: {str(e)}")
             return {"success": False, "error": str(e)}
+    
+    async def _query_cli_async(self, function, args):
+        cmd = self._query_command(function, args)
+        
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=self.network_path)
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=15)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                logger.error("Query timeout")
+                return {"success": False, "error": "Query timeout"}
+            
+            if proc.returncode != 0:
+                error = stderr.decode(errors='replace')
+                logger.error(f"Query failed: {error}")
+                return {"success": False, "error": error}
+            
+            return self._cli_response(stdout)
+        except Exception as e:
+            logger.error(f"Exception during query: {str(e)}")
+            return {"success": False, "error": str(e)}
+
+    def get_local_models(self, model_ids):
+        """Fetch local models, serving cached ones and batching the rest into one query"""
+        models = {}
+        missing = []
+        for model_id in model_ids:
+            cached = self._cache_get(('GetLocalModel', (model_id,)))
+            if cached is not None:
+                models[model_id] = self._parsed(cached)['data']
+            elif model_id not in missing:
+                missing.append(model_id)
+        
+        if missing:
+            result = self.query_chaincode('GetLocalModelsBatch', [to_json(missing)])
+            if result['success']:
+                batch = result['data'] if isinstance(result['data'], list) else []
+                for model in batch:
+                    models[model['modelID']] = model
+                    self._cache_put(('GetLocalModel', (model['modelID'],)), {"success": True, "raw": orjson.dumps(model)})
+            else:
+                # Chaincode deployed without GetLocalModelsBatch, fetch the
+                # models one per query but run the queries concurrently
+                results = self.query_chaincode_many('GetLocalModel', [[model_id] for model_id in missing])
+                for model_id, result in zip(missing, results):
+                    if result['success']:
+                        models[model_id] = result['data']
+        
+        return [models[model_id] for model_id in model_ids if model_id in models]
 
 fabric = FabricGateway()
 
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _scaled_add(out, values, scale):
+        """Add scale * values into out, spreading the elements across cores"""
+        for j in prange(out.shape[0]):
+            out[j] += values[j] * scale
+else:
+    def _scaled_add(out, values, scale):
+        """Add scale * values into out (values is overwritten)"""
+        np.multiply(values, scale, out=values)
+        np.add(out, values, out=out)
+
 class VPSAAggregator:
     """VPSA Aggregation Logic"""
     
+    # Aggregated weights are stored on the ledger as little-endian float16,
+    # submitted client weights as float32
+    WEIGHTS_WIRE_DTYPE = '<f2'
+    LOCAL_WEIGHTS_WIRE_DTYPE = '<f4'
+    
+    @staticmethod
+    def encode_array(value, dtype):
+        """Pack an array as base64 of its raw bytes with the dtype and shape to restore it"""
+        value = np.ascontiguousarray(value, dtype=dtype)
+        return {
+            'dtype': value.dtype.str,
+            'shape': list(value.shape),
+            'data': base64.b64encode(value.tobytes()).decode()
+        }
+    
     @staticmethod
-    def aggregate_weights(local_models, source_weight=0.6, target_weight=0.4):
-        source_weights = []
-        target_weights = []
-        
-        for model in local_models:
-            weights = json.loads(model.get('weights', '{}'))
-            if model.get('domain') == 'source':
-                source_weights.append(weights)
+    def decode_array(packed):
+        """Inverse of encode_array"""
+        data = base64.b64decode(packed['data'])
+        return np.frombuffer(data, dtype=np.dtype(packed['dtype'])).reshape(packed['shape'])
+    
+    @staticmethod
+    def encode_params(params, dtype):
+        """Pack every float list in params with encode_array, leaving other values as they are
+        
+        Lists of ints or bools are left as JSON so they keep their exact values.
+        """
+        packed = {}
+        for key, value in params.items():
+            if isinstance(value, list):
+                try:
+                    array = np.asarray(value)
+                except (ValueError, TypeError):
+                    array = None
+                if array is not None and array.dtype.kind == 'f':
+                    value = VPSAAggregator.encode_array(array, dtype)
+            packed[key] = value
+        return packed
+    
+    @staticmethod
+    def _accumulate(aggregated, shapes, params, scale):
+        """Add one client's scaled parameters into the flat running totals"""
+        for key, value in params.items():
+            if isinstance(value, dict):
+                # decode_array returns a read-only view, which the NumPy
+                # _scaled_add would write into, so always take a copy
+                value = VPSAAggregator.decode_array(value).astype(np.float64)
+            value = np.asarray(value, dtype=np.float64)
+            if key not in aggregated:
+                shapes[key] = value.shape
+                aggregated[key] = np.zeros(value.size, dtype=np.float64)
+            elif value.size != aggregated[key].size:
+                # The kernel does not bounds check, so never hand it mismatched sizes
+                raise ValueError(f"Parameter '{key}' has {value.size} values, expected {aggregated[key].size}")
+            _scaled_add(aggregated[key], value.reshape(-1), scale)
+    
+    @staticmethod
+    def _finalize(aggregated, shapes, dtype=None):
+        # Scalars are unwrapped, orjson cannot encode 0-d arrays and there is
+        # nothing to gain from packing a single number
+        result = {}
+        for key, value in aggregated.items():
+            if not shapes[key]:
+                result[key] = float(value[0])
+            elif dtype is not None:
+                result[key] = VPSAAggregator.encode_array(value.reshape(shapes[key]), dtype)
             else:
-                target_weights.append(weights)
+                result[key] = value.reshape(shapes[key])
+        return result
+    
+    @staticmethod
+    def aggregate_weights(local_models, source_weight=0.6, target_weight=0.4, stats=None):
+        """Weighted average of the clients' weights
         
+        If stats is an (N, 3) array it is filled with each model's accuracy, loss
+        and alignment loss on the same pass, see aggregate_weights_and_metrics.
+        """
+        is_source = [m.get('domain') == 'source' for m in local_models]
+        num_source = sum(is_source)
+        num_target = len(local_models) - num_source
+        
+        # Every client of a domain gets the same share of its domain's weight
+        source_scale = source_weight / num_source if num_source else 0.0
+        target_scale = target_weight / num_target if num_target else 0.0
+        
+        # Accumulate each client's scaled weights in place as soon as it is
+        # parsed, so only one model is held in memory alongside the totals
         aggregated = {}
+        shapes = {}
         
-        if source_weights:
-            for key in source_weights[0].keys():
-                values = [w[key] for w in source_weights if key in w]
-                if isinstance(values[0], list):
-                    aggregated[key] = [sum(x)/len(x) * source_weight for x in zip(*values)]
-                else:
-                    aggregated[key] = sum(values) / len(values) * source_weight
-        
-        if target_weights:
-            for key in target_weights[0].keys():
-                values = [w[key] for w in target_weights if key in w]
-                if isinstance(values[0], list):
-                    if key in aggregated:
-                        aggregated[key] = [a + (sum(x)/len(x) * target_weight) 
-                                          for a, x in zip(aggregated[key], zip(*values))]
-                    else:
-                        aggregated[key] = [sum(x)/len(x) * target_weight for x in zip(*values)]
-                else:
-                    if key in aggregated:
-                        aggregated[key] += sum(values) / len(values) * target_weight
-                    else:
-                        aggregated[key] = sum(values) / len(values) * target_weight
+        for i, model in enumerate(local_models):
+            if stats is not None:
+                stats[i] = VPSAAggregator._model_stats(model)
+            scale = source_scale if is_source[i] else target_scale
+            weights = orjson.loads(model.get('weights', '{}'))
+            VPSAAggregator._accumulate(aggregated, shapes, weights, scale)
+            del weights
         
-        return json.dumps(aggregated)
+        return to_json(VPSAAggregator._finalize(aggregated, shapes, VPSAAggregator.WEIGHTS_WIRE_DTYPE))
     
     @staticmethod
     def aggregate_prototypes(local_models, alignment_weight=0.1):
-        all_prototypes = []
-        
-        for model in local_models:
-            prototypes = json.loads(model.get('prototypes', '{}'))
-            all_prototypes.append(prototypes)
-        
         aggregated = {}
-        if all_prototypes:
-            for key in all_prototypes[0].keys():
-                values = [p[key] for p in all_prototypes if key in p]
-                if isinstance(values[0], list):
-                    aggregated[key] = [sum(x)/len(x) for x in zip(*values)]
-                else:
-                    aggregated[key] = sum(values) / len(values)
+        shapes = {}
+        
+        if local_models:
+            scale = 1.0 / len(local_models)
+            for model in local_models:
+                prototypes = orjson.loads(model.get('prototypes', '{}'))
+                VPSAAggregator._accumulate(aggregated, shapes, prototypes, scale)
+                del prototypes
         
-        return json.dumps(aggregated)
+        return to_json(VPSAAggregator._finalize(aggregated, shapes))
     
     @staticmethod
-    def compute_metrics(local_models):
-        accuracies = [m.get('accuracy', 0) for m in local_models]
-        losses = [m.get('loss', 0) for m in local_models]
-        alignment_losses = [m.get('alignmentLoss', 0) for m in local_models]
+    def _model_stats(model):
+        return model.get('accuracy', 0), model.get('loss', 0), model.get('alignmentLoss', 0)
+    
+    @staticmethod
+    def _metrics_from_stats(stats):
+        if not len(stats):
+            return {'global_accuracy': 0, 'global_loss': 0, 'alignment_score': 0}
         
+        accuracy, loss, alignment_loss = stats.mean(axis=0)
         return {
-            'global_accuracy': sum(accuracies) / len(accuracies) if accuracies else 0,
-            'global_loss': sum(losses) / len(losses) if losses else 0,
-            'alignment_score': 1.0 - (sum(alignment_losses) / len(alignment_losses)) if alignment_losses else 0
+            'global_accuracy': float(accuracy),
+            'global_loss': float(loss),
+            'alignment_score': 1.0 - float(alignment_loss)
         }
+    
+    @staticmethod
+    def compute_metrics(local_models):
+        stats = np.fromiter((VPSAAggregator._model_stats(m) for m in local_models),
+                            dtype=(np.float64, 3), count=len(local_models))
+        return VPSAAggregator._metrics_from_stats(stats)
+    
+    @staticmethod
+    def aggregate_weights_and_metrics(local_models, source_weight=0.6, target_weight=0.4):
+        """aggregate_weights and compute_metrics in a single pass over local_models"""
+        stats = np.empty((len(local_models), 3), dtype=np.float64)
+        weights = VPSAAggregator.aggregate_weights(local_models, source_weight, target_weight, stats)
+        return weights, VPSAAggregator._metrics_from_stats(stats)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -241,13 +859,15 @@ def register_client():
 @app.route('/api/client/<client_id>', methods=['GET'])
 def get_client(client_id):
     try:
-        result = fabric.query_chaincode('GetClient', [client_id])
+        result = fabric.query_chaincode('GetClient', [client_id], raw=True)
         
         if result['success']:
+            if 'raw' in result:
+                return Response(result['raw'], mimetype='application/json'), 200
             data = result['data']
             if isinstance(data, str):
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
                     pass
             return jsonify(data), 200
@@ -268,16 +888,16 @@ def get_all_clients():
             if isinstance(data, str):
                 data = data.strip()
                 if not data or data == '\n':
-                    return jsonify([]), 200
+                    return fastjson([])
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
-                    return jsonify([]), 200
+                    return fastjson([])
             
             if not isinstance(data, list):
                 data = [data] if data else []
             
-            return jsonify(data), 200
+            return fastjson(data)
         else:
             return jsonify({'error': result['error']}), 500
             
@@ -289,9 +909,15 @@ def get_all_clients():
 def submit_local_model():
     try:
         data = request.json
-        weights = json.dumps(data.get('weights', {}))
-        latent_features = json.dumps(data.get('latentFeatures', {}))
-        prototypes = json.dumps(data.get('prototypes', {}))
+        weights = data.get('weights', {})
+        if not isinstance(weights, dict):
+            return jsonify({'error': 'weights must be an object mapping parameter names to values'}), 400
+        
+        # Weights are packed as raw float32 so the ledger copy is compact and the
+        # aggregator can decode it without parsing every float
+        weights = to_json(VPSAAggregator.encode_params(weights, VPSAAggregator.LOCAL_WEIGHTS_WIRE_DTYPE))
+        latent_features = to_json(data.get('latentFeatures', {}))
+        prototypes = to_json(data.get('prototypes', {}))
         
         args = [
             data.get('modelID'),
@@ -322,13 +948,15 @@ def submit_local_model():
 @app.route('/api/model/<model_id>', methods=['GET'])
 def get_local_model(model_id):
     try:
-        result = fabric.query_chaincode('GetLocalModel', [model_id])
+        result = fabric.query_chaincode('GetLocalModel', [model_id], raw=True)
         
         if result['success']:
+            if 'raw' in result:
+                return Response(result['raw'], mimetype='application/json'), 200
             data = result['data']
             if isinstance(data, str):
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
                     pass
             return jsonify(data), 200
@@ -348,12 +976,12 @@ def get_models_by_round(round_num):
             data = result['data']
             if isinstance(data, str):
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
                     data = []
             if not isinstance(data, list):
                 data = [data] if data else []
-            return jsonify(data), 200
+            return fastjson(data)
         else:
             return jsonify({'error': result['error']}), 500
             
@@ -374,27 +1002,29 @@ def aggregate_models():
             return jsonify({'error': 'No models provided'}), 400
         
         local_models = []
-        for model_id in model_ids:
-            result = fabric.query_chaincode('GetLocalModel', [model_id])
-            if result['success']:
-                model_data = result['data']
-                if isinstance(model_data, str):
-                    try:
-                        model_data = json.loads(model_data)
-                    except:
-                        continue
-                local_models.append(model_data)
+        for model_data in fabric.get_local_models(model_ids):
+            if isinstance(model_data, str):
+                try:
+                    model_data = orjson.loads(model_data)
+                except:
+                    continue
+            local_models.append(model_data)
         
         if not local_models:
             return jsonify({'error': 'No valid models found'}), 404
         
         aggregator = VPSAAggregator()
-        aggregated_weights = aggregator.aggregate_weights(local_models, source_weight, target_weight)
-        aggregated_prototypes = aggregator.aggregate_prototypes(local_models, alignment_weight)
-        metrics = aggregator.compute_metrics(local_models)
+        try:
+            aggregated_weights, metrics = aggregator.aggregate_weights_and_metrics(
+                local_models, source_weight, target_weight)
+            aggregated_prototypes = aggregator.aggregate_prototypes(local_models, alignment_weight)
+        except ValueError as e:
+            # Raised for models whose parameters cannot be combined, e.g. layer sizes differ
+            logger.error(f"Error aggregating models: {str(e)}")
+            return jsonify({'error': str(e)}), 400
         
         args = [
-            json.dumps(model_ids),
+            to_json(model_ids),
             aggregated_weights,
             aggregated_prototypes,
             str(metrics['global_accuracy']),
@@ -420,13 +1050,15 @@ def aggregate_models():
 @app.route('/api/global-model', methods=['GET'])
 def get_global_model():
     try:
-        result = fabric.query_chaincode('GetGlobalModel', [])
+        result = fabric.query_chaincode('GetGlobalModel', [], raw=True)
         
         if result['success']:
+            if 'raw' in result:
+                return Response(result['raw'], mimetype='application/json'), 200
             data = result['data']
             if isinstance(data, str):
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
                     pass
             return jsonify(data), 200
@@ -438,13 +1070,15 @@ def get_global_model():
 @app.route('/api/config', methods=['GET'])
 def get_config():
     try:
-        result = fabric.query_chaincode('GetAggregationConfig', [])
+        result = fabric.query_chaincode('GetAggregationConfig', [], raw=True)
         
         if result['success']:
+            if 'raw' in result:
+                return Response(result['raw'], mimetype='application/json'), 200
             data = result['data']
             if isinstance(data, str):
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
                     pass
             return jsonify(data), 200
@@ -477,13 +1111,15 @@ def update_config():
 @app.route('/api/metrics/<int:round_num>', methods=['GET'])
 def get_round_metrics(round_num):
     try:
-        result = fabric.query_chaincode('GetTrainingMetrics', [str(round_num)])
+        result = fabric.query_chaincode('GetTrainingMetrics', [str(round_num)], raw=True)
         
         if result['success']:
+            if 'raw' in result:
+                return Response(result['raw'], mimetype='application/json'), 200
             data = result['data']
             if isinstance(data, str):
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
                     pass
             return jsonify(data), 200
@@ -501,12 +1137,12 @@ def get_all_metrics():
             data = result['data']
             if isinstance(data, str):
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
                     data = []
             if not isinstance(data, list):
                 data = [data] if data else []
-            return jsonify(data), 200
+            return fastjson(data)
         else:
             return jsonify({'error': result['error']}), 500
     except Exception as e:
@@ -521,10 +1157,10 @@ def get_global_model_history():
             data = result['data']
             if isinstance(data, str):
                 try:
-                    data = json.loads(data)
+                    data = orjson.loads(data)
                 except:
                     data = []
-            return jsonify(data), 200
+            return fastjson(data)
         else:
             return jsonify({'error': result['error']}), 500
     except Exception as e:
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
 import sys
@@ -19,6 +20,12 @@ class TestRunner:
         self.tests_run = 0
         self.tests_passed = 0
         self.tests_failed = 0
+        
+        # Reuse one keep-alive connection for every test instead of a new
+        # TCP connection per request
+        self.session = requests.Session()
+        self.session.headers['Content-Type'] = 'application/json'
+        self.session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
     
     def print_header(self, text):
         print(f"\n{Colors.BLUE}{'='*50}")
@@ -31,11 +38,11 @@ class TestRunner:
         
         try:
             if method == "GET":
-                response = requests.get(url)
+                response = self.session.get(url)
             elif method == "POST":
-                response = requests.post(url, json=data)
+                response = self.session.post(url, json=data)
             elif method == "PUT":
-                response = requests.put(url, json=data)
+                response = self.session.put(url, json=data)
             else:
                 raise ValueError(f"Unsupported method: {method}")
             
@@ -78,6 +85,23 @@ class TestRunner:
             self.tests_failed += 1
             return False
     
+    def wait_for(self, url, expected_in_response=None, timeout=3.0):
+        """Poll url with exponential backoff until it answers 200 (with the expected text)"""
+        delay = 0.05
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                response = self.session.get(url)
+                if response.status_code == 200 and (
+                        expected_in_response is None or expected_in_response in response.text):
+                    return True
+            except requests.exceptions.ConnectionError:
+                pass
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+            delay *= 2
+    
     def print_summary(self):
         self.print_header("TEST SUMMARY")
         print(f"Total Tests: {self.tests_run}")
@@ -97,7 +121,6 @@ def main():
         f"{BASE_URL}/health",
         expected_in_response="healthy"
     )
-    time.sleep(1)
     
     # Test 2: Get Initial Config
     runner.run_test(
@@ -106,7 +129,6 @@ def main():
         f"{BASE_URL}/api/config",
         expected_in_response="configID"
     )
-    time.sleep(1)
     
     # Test 3: Register Source Client 1
     runner.run_test(
@@ -121,7 +143,6 @@ def main():
         expected_status=201,
         expected_in_response="registered"
     )
-    time.sleep(3)
     
     # Test 4: Register Source Client 2
     runner.run_test(
@@ -135,7 +156,6 @@ def main():
         },
         expected_status=201
     )
-    time.sleep(3)
     
     # Test 5: Register Target Client
     runner.run_test(
@@ -149,7 +169,10 @@ def main():
         },
         expected_status=201
     )
-    time.sleep(3)
+    
+    # Invokes wait for the commit event, but the backend caches the client
+    # list for a couple of seconds
+    runner.wait_for(f"{BASE_URL}/api/clients", expected_in_response="py-target-1")
     
     # Test 6: Get All Clients
     runner.run_test(
@@ -158,7 +181,6 @@ def main():
         f"{BASE_URL}/api/clients",
         expected_in_response="py-source-1"
     )
-    time.sleep(1)
     
     # Test 7: Submit Source Model 1
     runner.run_test(
@@ -178,7 +200,6 @@ def main():
         },
         expected_status=201
     )
-    time.sleep(3)
     
     # Test 8: Submit Source Model 2
     runner.run_test(
@@ -198,7 +219,6 @@ def main():
         },
         expected_status=201
     )
-    time.sleep(3)
     
     # Test 9: Submit Target Model
     runner.run_test(
@@ -218,7 +238,8 @@ def main():
         },
         expected_status=201
     )
-    time.sleep(3)
+    
+    runner.wait_for(f"{BASE_URL}/api/model/py-model-t1-r0")
     
     # Test 10: Aggregate Models
     runner.run_test(
@@ -233,7 +254,8 @@ def main():
         },
         expected_in_response="aggregated"
     )
-    time.sleep(3)
+    
+    runner.wait_for(f"{BASE_URL}/api/metrics/0")
     
     # Test 11: Get Global Model
     runner.run_test(
@@ -242,7 +264,6 @@ def main():
         f"{BASE_URL}/api/global-model",
         expected_in_response="vpsa-global-model"
     )
-    time.sleep(1)
     
     # Test 12: Get Metrics for Round 0
     runner.run_test(
@@ -251,7 +272,6 @@ def main():
         f"{BASE_URL}/api/metrics/0",
         expected_in_response="round"
     )
-    time.sleep(1)
     
     # Print Summary
     runner.print_summary()
@@ -0,0 +1,31 @@
+import multiprocessing
+import sys
+
+# Production server for the VPSA backend: gunicorn -c gunicorn_conf.py app:app
+bind = '0.0.0.0:5000'
+
+# Each request spends most of its time waiting on the Fabric network, so run
+# several gevent workers and let every worker serve many requests at once
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_class = 'gevent'
+
+# Invokes wait for the transaction to commit (up to 30s), leave headroom
+timeout = 60
+keepalive = 30
+
+def post_fork(server, worker):
+    # app.py is imported by each worker, as preload_app is off; should it be
+    # turned on, drop the connections and cached results the master created
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        app_module.fabric.reset()
+
+def post_worker_init(worker):
+    # The worker is monkey patched by now; grpc, used by the default 'sdk'
+    # gateway, hangs under gevent unless switched to gevent-aware polling
+    # before it opens a channel
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+    except ImportError:
+        return
+    grpc_gevent.init_gevent()
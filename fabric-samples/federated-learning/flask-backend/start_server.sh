@@ -15,7 +15,16 @@ source venv/bin/activate
 pip install --upgrade pip
 
 # Install only necessary packages
-pip install Flask==3.0.0 Flask-CORS==4.0.0
+pip install Flask==3.0.0 numpy orjson gunicorn gevent
+
+# gRPC Fabric SDK for the default 'sdk' gateway; without it the backend falls
+# back to the peer CLI
+pip install fabric-sdk-py
+
+# Build the peer helper used when FABRIC_CONFIG['gateway'] is 'helper'
+if command -v go >/dev/null; then
+    (cd ../peer-helper && go build -o peer-helper .)
+fi
 
 echo "✅ Starting Flask server..."
-python app.py
\ No newline at end of file
+gunicorn -c gunicorn_conf.py app:app
\ No newline at end of file
@@ -0,0 +1,215 @@
+package main
+
+import (
+    "bufio"
+    "crypto/x509"
+    "encoding/json"
+    "flag"
+    "fmt"
+    "io"
+    "log"
+    "os"
+    "path"
+    "strings"
+    "time"
+
+    "github.com/hyperledger/fabric-gateway/pkg/client"
+    "github.com/hyperledger/fabric-gateway/pkg/hash"
+    "github.com/hyperledger/fabric-gateway/pkg/identity"
+    "github.com/hyperledger/fabric-protos-go-apiv2/gateway"
+    "google.golang.org/grpc"
+    "google.golang.org/grpc/credentials"
+    "google.golang.org/grpc/status"
+)
+
+// Request is one newline-delimited JSON line read from stdin
+type Request struct {
+    Type     string   `json:"type"` // "submit" or "evaluate"
+    Function string   `json:"function"`
+    Args     []string `json:"args"`
+}
+
+// Response is written to stdout as one line per request, in request order
+type Response struct {
+    Result *string `json:"result,omitempty"`
+    Error  string  `json:"error,omitempty"`
+}
+
+// peer-helper keeps one Fabric Gateway connection open and serves chaincode
+// calls over stdio, so the Flask backend does not start a peer CLI per call.
+// The peer, TLS and MSP settings come from the same CORE_PEER_* variables
+// the peer CLI reads.
+func main() {
+    channelName := flag.String("channel", "vpsa-channel", "channel name")
+    chaincodeName := flag.String("chaincode", "vpsa", "chaincode name")
+    flag.Parse()
+
+    log.SetOutput(os.Stderr)
+    log.SetPrefix("peer-helper: ")
+
+    clientConnection := newGrpcConnection()
+    defer clientConnection.Close()
+
+    gw, err := client.Connect(
+        newIdentity(),
+        client.WithSign(newSign()),
+        client.WithHash(hash.SHA256),
+        client.WithClientConnection(clientConnection),
+        client.WithEvaluateTimeout(15*time.Second),
+        client.WithEndorseTimeout(15*time.Second),
+        client.WithSubmitTimeout(5*time.Second),
+        client.WithCommitStatusTimeout(30*time.Second),
+    )
+    if err != nil {
+        log.Fatalf("failed to connect to gateway: %v", err)
+    }
+    defer gw.Close()
+
+    contract := gw.GetNetwork(*channelName).GetContract(*chaincodeName)
+
+    // Model weights make for long lines, so read whole lines instead of
+    // using a Scanner with a fixed token limit
+    reader := bufio.NewReaderSize(os.Stdin, 1<<20)
+    writer := bufio.NewWriter(os.Stdout)
+    encoder := json.NewEncoder(writer)
+    encoder.SetEscapeHTML(false)
+
+    for {
+        line, err := reader.ReadBytes('\n')
+        if len(strings.TrimSpace(string(line))) > 0 {
+            if encodeErr := encoder.Encode(handle(contract, line)); encodeErr != nil {
+                log.Fatalf("failed to write response: %v", encodeErr)
+            }
+            if flushErr := writer.Flush(); flushErr != nil {
+                log.Fatalf("failed to write response: %v", flushErr)
+            }
+        }
+        if err == io.EOF {
+            return
+        }
+        if err != nil {
+            log.Fatalf("failed to read request: %v", err)
+        }
+    }
+}
+
+// handle runs one request and turns failures into an error response
+func handle(contract *client.Contract, line []byte) Response {
+    var request Request
+    if err := json.Unmarshal(line, &request); err != nil {
+        return Response{Error: fmt.Sprintf("invalid request: %v", err)}
+    }
+
+    var result []byte
+    var err error
+    switch request.Type {
+    case "submit":
+        // SubmitTransaction blocks until the transaction is committed, like --waitForEvent
+        result, err = contract.SubmitTransaction(request.Function, request.Args...)
+    case "evaluate":
+        result, err = contract.EvaluateTransaction(request.Function, request.Args...)
+    default:
+        return Response{Error: fmt.Sprintf("unknown request type %q", request.Type)}
+    }
+    if err != nil {
+        return Response{Error: describeError(err)}
+    }
+
+    payload := string(result)
+    return Response{Result: &payload}
+}
+
+// describeError includes the per-peer details the gateway attaches to endorsement failures
+func describeError(err error) string {
+    message := err.Error()
+    for _, detail := range status.Convert(err).Details() {
+        if errorDetail, ok := detail.(*gateway.ErrorDetail); ok {
+            message += fmt.Sprintf("; %s (%s): %s", errorDetail.GetAddress(), errorDetail.GetMspId(), errorDetail.GetMessage())
+        }
+    }
+    return message
+}
+
+// newGrpcConnection creates a gRPC connection to the peer at CORE_PEER_ADDRESS
+func newGrpcConnection() *grpc.ClientConn {
+    certificatePEM, err := os.ReadFile(os.Getenv("CORE_PEER_TLS_ROOTCERT_FILE"))
+    if err != nil {
+        log.Fatalf("failed to read TLS certificate file: %v", err)
+    }
+
+    certificate, err := identity.CertificateFromPEM(certificatePEM)
+    if err != nil {
+        log.Fatal(err)
+    }
+
+    serverName := os.Getenv("CORE_PEER_TLS_SERVERHOSTOVERRIDE")
+    if serverName == "" {
+        serverName = "peer0.org1.example.com"
+    }
+
+    certPool := x509.NewCertPool()
+    certPool.AddCert(certificate)
+    transportCredentials := credentials.NewClientTLSFromCert(certPool, serverName)
+
+    connection, err := grpc.NewClient("dns:///"+os.Getenv("CORE_PEER_ADDRESS"), grpc.WithTransportCredentials(transportCredentials))
+    if err != nil {
+        log.Fatalf("failed to create gRPC connection: %v", err)
+    }
+
+    return connection
+}
+
+// newIdentity loads the X.509 identity from the MSP at CORE_PEER_MSPCONFIGPATH
+func newIdentity() *identity.X509Identity {
+    certificatePEM, err := readFirstFile(path.Join(os.Getenv("CORE_PEER_MSPCONFIGPATH"), "signcerts"))
+    if err != nil {
+        log.Fatalf("failed to read certificate file: %v", err)
+    }
+
+    certificate, err := identity.CertificateFromPEM(certificatePEM)
+    if err != nil {
+        log.Fatal(err)
+    }
+
+    id, err := identity.NewX509Identity(os.Getenv("CORE_PEER_LOCALMSPID"), certificate)
+    if err != nil {
+        log.Fatal(err)
+    }
+
+    return id
+}
+
+// newSign signs with the private key from the MSP at CORE_PEER_MSPCONFIGPATH
+func newSign() identity.Sign {
+    privateKeyPEM, err := readFirstFile(path.Join(os.Getenv("CORE_PEER_MSPCONFIGPATH"), "keystore"))
+    if err != nil {
+        log.Fatalf("failed to read private key file: %v", err)
+    }
+
+    privateKey, err := identity.PrivateKeyFromPEM(privateKeyPEM)
+    if err != nil {
+        log.Fatal(err)
+    }
+
+    sign, err := identity.NewPrivateKeySign(privateKey)
+    if err != nil {
+        log.Fatal(err)
+    }
+
+    return sign
+}
+
+func readFirstFile(dirPath string) ([]byte, error) {
+    dir, err := os.Open(dirPath)
+    if err != nil {
+        return nil, err
+    }
+    defer dir.Close()
+
+    fileNames, err := dir.Readdirnames(1)
+    if err != nil {
+        return nil, err
+    }
+
+    return os.ReadFile(path.Join(dirPath, fileNames[0]))
+}